@@ -5,12 +5,23 @@ Listens to a specified MQTT topic and displays desktop notifications when alerts
 """
 
 import paho.mqtt.client as mqtt
+from paho.mqtt.subscribeoptions import SubscribeOptions
 import subprocess
 import logging
 import sys
 import time
 import signal
 import os
+import queue
+import threading
+
+# libnotify bindings are optional; fall back to notify-send when unavailable
+try:
+    import gi
+    gi.require_version('Notify', '0.7')
+    from gi.repository import Notify
+except (ImportError, ValueError):
+    Notify = None
 
 # Configure logging
 logging.basicConfig(
@@ -28,34 +39,94 @@ MQTT_PORT = 1883
 MQTT_USER = "username"  # Replace with your MQTT username
 MQTT_PASSWORD = "password"  # Replace with your MQTT password
 MQTT_TOPIC = "homeassistant/binary_sensor/alert/state"  # Replace with your alert topic
-TRIGGER_VALUES = ["on", "ON", "\"on\"", "\"ON\""]
+TRIGGER_VALUES = ["on"]  # Matched case-insensitively, with or without quotes
+# Normalised once at import so the alert handler can match raw payload bytes with a set lookup
+TRIGGER_BYTES = frozenset(v.strip().lower().strip('"').encode('ascii') for v in TRIGGER_VALUES)
+# Anything longer than the longest trigger (plus quotes and a little whitespace) can't match
+TRIGGER_MAX_LEN = max(len(v) for v in TRIGGER_BYTES) + 4
+
+# MQTTv5 session settings: a clean, QoS 0 session means the broker never builds up a
+# backlog of queued alerts. The keepalive stays short so a half-open connection is
+# noticed within a couple of minutes rather than silently dropping alerts.
+MQTT_KEEPALIVE = 60
+MQTT_QOS = 0
+MQTT_MAX_INFLIGHT = 20
+
+# Cached libnotify notification, reused for every alert
+notification = None
+
+# Alerts are handed off to a worker so paho's network thread never blocks
+alert_queue = queue.Queue(maxsize=128)
+
+# Set by the signal handler; the main thread does the actual shutdown
+shutdown_event = threading.Event()
+
+def init_notifications():
+    """Initialise libnotify once so alerts don't fork notify-send."""
+    global notification
+    if Notify is None:
+        logger.info("libnotify bindings not available, using notify-send")
+        return
+    try:
+        if Notify.init("mqtt-notifier"):
+            notification = Notify.Notification.new("", "", None)
+    except Exception as e:
+        logger.warning(f"Failed to initialise libnotify, using notify-send: {e}")
 
 def send_notification(title, message):
-    """Send a desktop notification using notify-send."""
+    """Send a desktop notification via libnotify, or notify-send as a fallback."""
     try:
-        subprocess.run(["notify-send", title, message])
+        if notification is not None:
+            notification.update(title, message, None)
+            notification.show()
+        else:
+            subprocess.run(["notify-send", title, message])
         logger.info(f"Notification sent: {title} - {message}")
     except Exception as e:
         logger.error(f"Failed to send notification: {e}")
 
-def on_connect(client, userdata, flags, rc):
+def notification_worker():
+    """Send queued notifications outside of the MQTT network thread."""
+    while True:
+        title, message = alert_queue.get()
+        send_notification(title, message)
+        alert_queue.task_done()
+
+def on_connect(client, userdata, flags, rc, properties=None):
     """Callback for when the client connects to the MQTT broker."""
     if rc == 0:
         logger.info("Connected to MQTT broker")
-        client.subscribe(MQTT_TOPIC)
-        logger.info(f"Subscribed to topic: {MQTT_TOPIC}")
+        for topic in TOPIC_HANDLERS:
+            client.subscribe(topic, options=SubscribeOptions(qos=MQTT_QOS, noLocal=True))
+            logger.info(f"Subscribed to topic: {topic}")
     else:
         logger.error(f"Failed to connect to MQTT broker with code: {rc}")
 
 def on_message(client, userdata, msg):
-    """Callback for when a message is received from the MQTT broker."""
-    payload = msg.payload.decode().strip().lower()
-    logger.info(f"Message received on topic {msg.topic}: {payload}")
+    """Callback for messages on topics without a registered handler."""
+    logger.debug(f"Ignoring message on unhandled topic {msg.topic}")
+
+def on_alert_message(client, userdata, msg):
+    """Callback for when a message is received on the alert topic."""
+    raw = msg.payload
+    if len(raw) > TRIGGER_MAX_LEN:
+        logger.debug(f"Ignoring {len(raw)}-byte payload on topic {msg.topic}")
+        return
+    payload = raw.strip().lower().strip(b'"')
+    logger.info(f"Message received on topic {msg.topic}: {raw.decode('ascii', 'replace')}")
     
-    if payload in [v.lower() for v in TRIGGER_VALUES]:
-        send_notification("Alert Notification", "Emergency alert received! Please check official sources.")
+    if payload in TRIGGER_BYTES:
+        try:
+            alert_queue.put_nowait(("Alert Notification", "Emergency alert received! Please check official sources."))
+        except queue.Full:
+            logger.warning("Alert queue full, dropping notification")
 
-def on_disconnect(client, userdata, rc):
+# Per-topic message handlers, dispatched by paho's topic matcher rather than in on_message
+TOPIC_HANDLERS = {
+    MQTT_TOPIC: on_alert_message,
+}
+
+def on_disconnect(client, userdata, rc, properties=None):
     """Callback for when the client disconnects from the MQTT broker."""
     if rc != 0:
         logger.warning(f"Unexpected disconnection from MQTT broker with code: {rc}")
@@ -63,38 +134,45 @@ def on_disconnect(client, userdata, rc):
         logger.info("Disconnected from MQTT broker")
 
 def signal_handler(sig, frame):
-    """Handle keyboard interrupts gracefully."""
-    logger.info("Shutting down MQTT notifier...")
-    client.disconnect()
-    sys.exit(0)
+    """Request a graceful shutdown; paho calls are left to the main thread."""
+    shutdown_event.set()
 
 if __name__ == "__main__":
     # Set up signal handler for graceful shutdown
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
     
+    # Set up desktop notifications
+    init_notifications()
+    threading.Thread(target=notification_worker, daemon=True).start()
+    
     # Create MQTT client
-    client = mqtt.Client()
+    client = mqtt.Client(client_id="", protocol=mqtt.MQTTv5)
     client.username_pw_set(MQTT_USER, MQTT_PASSWORD)
+    client.max_inflight_messages_set(MQTT_MAX_INFLIGHT)
     
     # Set up callbacks
     client.on_connect = on_connect
     client.on_message = on_message
     client.on_disconnect = on_disconnect
+    for topic, handler in TOPIC_HANDLERS.items():
+        client.message_callback_add(topic, handler)
     
     # Connect to MQTT broker
     try:
         logger.info(f"Connecting to MQTT broker at {MQTT_BROKER}:{MQTT_PORT}...")
-        client.connect(MQTT_BROKER, MQTT_PORT, 60)
+        client.connect(MQTT_BROKER, MQTT_PORT, MQTT_KEEPALIVE, clean_start=True)
     except Exception as e:
         logger.error(f"Failed to connect to MQTT broker: {e}")
         sys.exit(1)
     
-    # Start the MQTT client loop
-    try:
-        logger.info("MQTT notifier started. Press Ctrl+C to exit.")
-        client.loop_forever()
-    except KeyboardInterrupt:
-        logger.info("Shutting down MQTT notifier...")
-        client.disconnect()
-        sys.exit(0)
+    # Run the MQTT client loop in the background until a shutdown is requested
+    client.loop_start()
+    logger.info("MQTT notifier started. Press Ctrl+C to exit.")
+    shutdown_event.wait()
+    
+    logger.info("Shutting down MQTT notifier...")
+    # disconnect() wakes paho's loop thread, so loop_stop() returns promptly
+    client.disconnect()
+    client.loop_stop()
+    sys.exit(0)
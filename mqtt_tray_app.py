@@ -9,13 +9,17 @@ import sys
 import os
 import signal
 import logging
-import subprocess
 import threading
+import collections
+import functools
 import time
-import urllib.request
 import json
-from PyQt5 import QtWidgets, QtGui, QtCore, QtMultimedia
+from PyQt5 import QtWidgets, QtGui, QtCore
 import paho.mqtt.client as mqtt
+from paho.mqtt.subscribeoptions import SubscribeOptions
+
+# Imported on first use by SystemTrayApp.setup_alert_sound; it is slow to load
+QtMultimedia = None
 
 # Configure logging
 logging.basicConfig(
@@ -33,13 +37,40 @@ SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 # Settings file path
 SETTINGS_FILE = os.path.join(SCRIPT_DIR, 'settings.json')
 
+# Icon and sound paths
+ICONS_DIR = os.path.join(SCRIPT_DIR, 'icons')
+CONNECTED_ICON = os.path.join(ICONS_DIR, 'connected.png')
+DISCONNECTED_ICON = os.path.join(ICONS_DIR, 'disconnected.png')
+ALERT_ICON = os.path.join(ICONS_DIR, 'alert.png')
+SOUNDS_DIR = os.path.join(SCRIPT_DIR, 'sounds')
+ALERT_SOUND = os.path.join(SOUNDS_DIR, 'alert.mp3')
+FALLBACK_SOUND = os.path.join(SOUNDS_DIR, 'fallback_alert.mp3')
+
+# Checked once at import; normally all the tray icons ship with the app
+ICONS_READY = all(os.path.exists(path) for path in (CONNECTED_ICON, DISCONNECTED_ICON, ALERT_ICON))
+
 # Default MQTT Configuration
 DEFAULT_MQTT_BROKER = "192.168.1.100"  # Replace with your Home Assistant IP
 DEFAULT_MQTT_PORT = 1883
 DEFAULT_MQTT_USER = "username"  # Replace with your MQTT username
 DEFAULT_MQTT_PASSWORD = "password"  # Replace with your MQTT password
 DEFAULT_MQTT_TOPIC = "homeassistant/binary_sensor/alert/state"  # Replace with your alert topic
-TRIGGER_VALUES = ["on", "ON", "\"on\"", "\"ON\""]
+TRIGGER_VALUES = ["on"]  # Matched case-insensitively, with or without quotes
+# Normalised once at import so the alert handler can match raw payload bytes with a set lookup
+TRIGGER_BYTES = frozenset(v.strip().lower().strip('"').encode('ascii') for v in TRIGGER_VALUES)
+# Anything longer than the longest trigger (plus quotes and a little whitespace) can't match
+TRIGGER_MAX_LEN = max(len(v) for v in TRIGGER_BYTES) + 4
+ALERT_DEBOUNCE_NS = 10_000_000_000  # Ignore repeats of the same alert within 10 seconds
+ALERT_HISTORY_SIZE = 16  # Distinct recent alerts remembered for de-duplication
+ALERT_SOUND_REPEATS = 3  # Play the alert sound several times for emphasis
+FALLBACK_SOUND_URL = "https://www.soundjay.com/mechanical/sounds/alarm-1.mp3"  # Used if no custom sound is present
+
+# MQTTv5 session settings: a clean, QoS 0 session means the broker never builds up a
+# backlog of queued alerts. The keepalive stays short so a half-open connection is
+# noticed within a couple of minutes rather than silently dropping alerts.
+MQTT_KEEPALIVE = 60
+MQTT_QOS = 0
+MQTT_MAX_INFLIGHT = 20
 
 # Settings class to manage MQTT configuration
 class Settings:
@@ -49,22 +80,34 @@ class Settings:
         self.user = DEFAULT_MQTT_USER
         self.password = DEFAULT_MQTT_PASSWORD
         self.topic = DEFAULT_MQTT_TOPIC
+        self.mtime_ns = None  # Modification time of the file the current values came from
         self.load()
     
     def load(self):
-        """Load settings from file"""
-        if os.path.exists(SETTINGS_FILE):
-            try:
-                with open(SETTINGS_FILE, 'r') as f:
-                    settings = json.load(f)
-                    self.broker = settings.get('broker', DEFAULT_MQTT_BROKER)
-                    self.port = settings.get('port', DEFAULT_MQTT_PORT)
-                    self.user = settings.get('user', DEFAULT_MQTT_USER)
-                    self.password = settings.get('password', DEFAULT_MQTT_PASSWORD)
-                    self.topic = settings.get('topic', DEFAULT_MQTT_TOPIC)
-                    logger.info(f"Loaded settings from {SETTINGS_FILE}")
-            except Exception as e:
-                logger.error(f"Error loading settings: {e}")
+        """Load settings from file, skipping the parse if it hasn't changed since the last load"""
+        try:
+            mtime_ns = os.stat(SETTINGS_FILE).st_mtime_ns
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            logger.error(f"Error loading settings: {e}")
+            return
+        
+        if mtime_ns == self.mtime_ns:
+            return
+        
+        try:
+            with open(SETTINGS_FILE, 'r') as f:
+                settings = json.load(f)
+                self.broker = settings.get('broker', DEFAULT_MQTT_BROKER)
+                self.port = settings.get('port', DEFAULT_MQTT_PORT)
+                self.user = settings.get('user', DEFAULT_MQTT_USER)
+                self.password = settings.get('password', DEFAULT_MQTT_PASSWORD)
+                self.topic = settings.get('topic', DEFAULT_MQTT_TOPIC)
+                self.mtime_ns = mtime_ns
+                logger.info(f"Loaded settings from {SETTINGS_FILE}")
+        except Exception as e:
+            logger.error(f"Error loading settings: {e}")
     
     def save(self):
         """Save settings to file"""
@@ -76,104 +119,213 @@ class Settings:
             'topic': self.topic
         }
         
+        # Write to a temporary file and rename it over the original so a crash can't leave it half-written
+        tmp_file = SETTINGS_FILE + '.tmp'
         try:
-            with open(SETTINGS_FILE, 'w') as f:
-                json.dump(settings, f, indent=4)
+            data = json.dumps(settings, indent=4).encode()
+            # The file holds the MQTT password: keep the existing permissions, or owner-only for a new file
+            try:
+                mode = os.stat(SETTINGS_FILE).st_mode & 0o777
+            except FileNotFoundError:
+                mode = 0o600
+            fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'wb') as f:
+                os.fchmod(f.fileno(), mode)
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, SETTINGS_FILE)
+            # The in-memory values are already current; don't re-parse our own write
+            self.mtime_ns = os.stat(SETTINGS_FILE).st_mtime_ns
             logger.info(f"Saved settings to {SETTINGS_FILE}")
             return True
         except Exception as e:
             logger.error(f"Error saving settings: {e}")
+            try:
+                os.remove(tmp_file)
+            except OSError:
+                pass
             return False
 
 # Create settings instance
 settings = Settings()
 
-class MQTTClient(threading.Thread):
+class MQTTClient:
     def __init__(self, app):
-        threading.Thread.__init__(self)
-        self.daemon = True
         self.app = app
         self.connected = False
-        self.client = mqtt.Client()
-        self.client.username_pw_set(settings.user, settings.password)
+        self.connect_failed = False
+        self.client = mqtt.Client(client_id="", protocol=mqtt.MQTTv5)
+        self.client.max_inflight_messages_set(MQTT_MAX_INFLIGHT)
         self.client.on_connect = self.on_connect
+        self.client.on_connect_fail = self.on_connect_fail
         self.client.on_message = self.on_message
         self.client.on_disconnect = self.on_disconnect
-        self.last_alert_time = 0
-        self.running = True
+        # Let paho's network loop handle connection retries and backoff
+        self.client.reconnect_delay_set(min_delay=1, max_delay=60)
+        # Recent (key, monotonic ns) alerts, newest first
+        self.recent_alerts = collections.deque(maxlen=ALERT_HISTORY_SIZE)
+        self.alert_topic = None
+        self.loop_running = False
+        self.restart_lock = threading.Lock()  # Serialises background restarts
+        self.connection_settings = None  # (broker, port, user, password) the client was started with
     
-    def run(self):
+    def start(self):
+        """Connect with the current settings; paho's network loop runs in its own thread."""
+        if self.loop_running:
+            # Two loops on one paho client would fight over the socket
+            logger.warning("MQTT network loop is still running; not starting another")
+            return
+        settings.load()
         try:
             logger.info(f"Connecting to MQTT broker at {settings.broker}:{settings.port}...")
-            self.client.connect(settings.broker, settings.port, 60)
+            self.connect_failed = False
+            self.client.username_pw_set(settings.user, settings.password)
+            self.connection_settings = self.current_connection_settings()
+            self.set_alert_topic(settings.topic)
+            # Non-blocking; the network loop makes (and retries) the connection
+            self.client.connect_async(settings.broker, settings.port, MQTT_KEEPALIVE, clean_start=True)
+            # loop_start() also sets up the socketpair that lets other threads wake the loop
             self.client.loop_start()
-            
-            # Keep the thread alive
-            while self.running:
-                time.sleep(1)
-                
+            self.loop_running = True
         except Exception as e:
             logger.error(f"Failed to connect to MQTT broker: {e}")
-            self.app.mqtt_connection_failed()
+            self.app.connection_failed.emit()
+    
+    def set_alert_topic(self, topic):
+        """Route messages on the alert topic straight to on_alert_message via paho's topic matcher."""
+        if topic == self.alert_topic:
+            return
+        if self.alert_topic is not None:
+            self.client.message_callback_remove(self.alert_topic)
+        self.client.message_callback_add(topic, self.on_alert_message)
+        self.alert_topic = topic
+    
+    def current_connection_settings(self):
+        return (settings.broker, settings.port, settings.user, settings.password)
+    
+    def apply_settings(self):
+        """Apply the current settings, only tearing down the connection if it has changed."""
+        settings.load()
+        if self.connected and self.connection_settings == self.current_connection_settings():
+            if settings.topic != self.alert_topic:
+                # A topic change only needs a new subscription, not a new connection
+                logger.info(f"Switching subscription from {self.alert_topic} to {settings.topic}")
+                self.client.unsubscribe(self.alert_topic)
+                self.set_alert_topic(settings.topic)
+                self.client.subscribe(self.alert_topic, options=SubscribeOptions(qos=MQTT_QOS, noLocal=True))
+            return
+        
+        self.reconnect()
+    
+    def reconnect(self):
+        """Drop the current connection and connect again with the current settings."""
+        settings.load()
+        threading.Thread(target=self._reconnect, daemon=True).start()
+    
+    def _reconnect(self):
+        # Overlapping restarts (e.g. repeated Reconnect clicks) run one after another
+        with self.restart_lock:
+            self.stop()
+            self.start()
     
     def stop(self):
-        self.running = False
-        self.client.loop_stop()
+        """Disconnect and wait for the network loop to finish."""
+        # disconnect() queues the DISCONNECT and wakes the loop through paho's socketpair,
+        # so loop_stop() returns promptly; a pending TCP connect is bounded by paho's connect timeout
         self.client.disconnect()
+        self.client.loop_stop()
+        self.loop_running = False
     
-    def on_connect(self, client, userdata, flags, rc):
+    def on_connect(self, client, userdata, flags, rc, properties=None):
         if rc == 0:
             logger.info("Connected to MQTT broker")
             self.connected = True
-            client.subscribe(settings.topic)
-            logger.info(f"Subscribed to topic: {settings.topic}")
-            self.app.mqtt_connected()
+            self.connect_failed = False
+            client.subscribe(self.alert_topic, options=SubscribeOptions(qos=MQTT_QOS, noLocal=True))
+            logger.info(f"Subscribed to topic: {self.alert_topic}")
+            self.app.connected.emit()
         else:
             logger.error(f"Failed to connect to MQTT broker with code: {rc}")
             self.connected = False
-            self.app.mqtt_connection_failed()
+            self.app.connection_failed.emit()
+    
+    def on_connect_fail(self, client, userdata):
+        logger.error("Failed to connect to MQTT broker, retrying...")
+        # Only report the first failure of a retry sequence
+        if not self.connect_failed:
+            self.connect_failed = True
+            self.app.connection_failed.emit()
     
     def on_message(self, client, userdata, msg):
-        payload = msg.payload.decode().strip().lower()
-        logger.info(f"Message received on topic {msg.topic}: {payload}")
-        
-        if payload in [v.lower() for v in TRIGGER_VALUES]:
-            # Avoid duplicate alerts within 10 seconds
-            current_time = time.time()
-            if current_time - self.last_alert_time > 10:
-                self.last_alert_time = current_time
-                self.app.show_alert_notification()
+        logger.debug(f"Ignoring message on unhandled topic {msg.topic}")
     
-    def on_disconnect(self, client, userdata, rc):
+    def on_alert_message(self, client, userdata, msg):
+        raw = msg.payload
+        if len(raw) > TRIGGER_MAX_LEN:
+            logger.debug(f"Ignoring {len(raw)}-byte payload on topic {msg.topic}")
+            return
+        payload = raw.strip().lower().strip(b'"')
+        logger.info(f"Message received on topic {msg.topic}: {raw.decode('ascii', 'replace')}")
+        
+        if payload in TRIGGER_BYTES:
+            if self.is_duplicate_alert((msg.topic, payload)):
+                return
+            # Queued onto the GUI thread, so this never blocks the network loop
+            self.app.alert.emit()
+    
+    def is_duplicate_alert(self, key):
+        """Record an alert and report whether the same one was already seen within the debounce window."""
+        # Monotonic so clock adjustments can't skew the window
+        now = time.monotonic_ns()
+        while self.recent_alerts and now - self.recent_alerts[-1][1] > ALERT_DEBOUNCE_NS:
+            self.recent_alerts.pop()
+        if any(seen_key == key for seen_key, _ in self.recent_alerts):
+            return True
+        self.recent_alerts.appendleft((key, now))
+        return False
+    
+    def on_disconnect(self, client, userdata, rc, properties=None):
         self.connected = False
         if rc != 0:
             logger.warning(f"Unexpected disconnection from MQTT broker with code: {rc}")
-            self.app.mqtt_disconnected()
+            self.app.disconnected.emit()
         else:
             logger.info("Disconnected from MQTT broker")
 
 
 class SystemTrayApp(QtWidgets.QSystemTrayIcon):
+    # MQTT events arrive on paho's threads; signals queue them onto the GUI thread
+    connected = QtCore.pyqtSignal()
+    disconnected = QtCore.pyqtSignal()
+    connection_failed = QtCore.pyqtSignal()
+    alert = QtCore.pyqtSignal()
+    
     def __init__(self, parent=None):
         QtWidgets.QSystemTrayIcon.__init__(self, parent)
+        self.connected.connect(self.mqtt_connected)
+        self.disconnected.connect(self.mqtt_disconnected)
+        self.connection_failed.connect(self.mqtt_connection_failed)
+        self.alert.connect(self.queue_alert)
         self.setToolTip('MQTT Alert Notifier')
         
-        # Set up icons
-        self.icon_connected = QtGui.QIcon(os.path.join(SCRIPT_DIR, 'icons', 'connected.png'))
-        self.icon_disconnected = QtGui.QIcon(os.path.join(SCRIPT_DIR, 'icons', 'disconnected.png'))
-        self.icon_alert = QtGui.QIcon(os.path.join(SCRIPT_DIR, 'icons', 'alert.png'))
+        # Set up sounds directory
+        os.makedirs(SOUNDS_DIR, exist_ok=True)
         
-        # Set up sound paths
-        self.sounds_dir = os.path.join(SCRIPT_DIR, 'sounds')
-        os.makedirs(self.sounds_dir, exist_ok=True)
-        self.alert_sound_path = os.path.join(self.sounds_dir, 'alert.mp3')
-        self.fallback_sound_path = os.path.join(self.sounds_dir, 'fallback_alert.mp3')
+        # Preload the alert sound once the tray is up; QtMultimedia is slow to import
+        self.alert_player = None
+        self.loaded_sound_path = None
+        self.alert_sound_requested = False
+        self.qt_sound_unavailable = False  # Set if QtMultimedia can't be imported
+        self.fallback_download = None  # Background download of FALLBACK_SOUND, if one has been started
+        QtCore.QTimer.singleShot(0, self.setup_alert_sound)
         
-        # Create default icons if they don't exist
+        # Set up icons, painting defaults for any that don't exist
         self.create_default_icons()
         
         # Set initial icon
-        self.setIcon(self.icon_disconnected)
+        self.current_icon = None
+        self._set_icon('disconnected', self.icon_disconnected)
         
         # Create menu
         self.menu = QtWidgets.QMenu()
@@ -223,98 +375,99 @@ class SystemTrayApp(QtWidgets.QSystemTrayIcon):
         self.alert_timer.setSingleShot(True)
         self.alert_timer.timeout.connect(self.reset_icon_after_alert)
         
-        # Set up a timer to check connection status
-        self.connection_timer = QtCore.QTimer(self)
-        self.connection_timer.setInterval(60000)  # Check every minute
-        self.connection_timer.timeout.connect(self.check_connection)
-        self.connection_timer.start()
+        # Set up a timer to coalesce a burst of alerts into a single notification
+        self.alert_pending = False
+        self.alert_flush_timer = QtCore.QTimer(self)
+        self.alert_flush_timer.setSingleShot(True)
+        self.alert_flush_timer.timeout.connect(self.flush_alert)
         
         # Start MQTT client
         self.mqtt_client = MQTTClient(self)
         self.mqtt_client.start()
     
     def create_default_icons(self):
-        """Create default icons if they don't exist."""
-        icons_dir = os.path.join(SCRIPT_DIR, 'icons')
-        os.makedirs(icons_dir, exist_ok=True)
-        
-        # Define icon paths
-        connected_icon_path = os.path.join(icons_dir, 'connected.png')
-        disconnected_icon_path = os.path.join(icons_dir, 'disconnected.png')
-        alert_icon_path = os.path.join(icons_dir, 'alert.png')
-        
-        # Create connected icon if it doesn't exist
-        if not os.path.exists(connected_icon_path):
-            pixmap = QtGui.QPixmap(32, 32)
-            pixmap.fill(QtCore.Qt.transparent)
-            painter = QtGui.QPainter(pixmap)
-            painter.setPen(QtCore.Qt.NoPen)
-            painter.setBrush(QtGui.QBrush(QtGui.QColor(0, 128, 0)))  # Green
-            painter.drawEllipse(8, 8, 16, 16)
-            painter.end()
-            pixmap.save(connected_icon_path)
-        
-        # Create disconnected icon if it doesn't exist
-        if not os.path.exists(disconnected_icon_path):
-            pixmap = QtGui.QPixmap(32, 32)
-            pixmap.fill(QtCore.Qt.transparent)
-            painter = QtGui.QPainter(pixmap)
-            painter.setPen(QtCore.Qt.NoPen)
-            painter.setBrush(QtGui.QBrush(QtGui.QColor(128, 128, 128)))  # Gray
-            painter.drawEllipse(8, 8, 16, 16)
-            painter.end()
-            pixmap.save(disconnected_icon_path)
-        
-        # Create alert icon if it doesn't exist
-        if not os.path.exists(alert_icon_path):
-            pixmap = QtGui.QPixmap(32, 32)
-            pixmap.fill(QtCore.Qt.transparent)
-            painter = QtGui.QPainter(pixmap)
-            painter.setPen(QtCore.Qt.NoPen)
-            painter.setBrush(QtGui.QBrush(QtGui.QColor(255, 0, 0)))  # Red
-            painter.drawEllipse(8, 8, 16, 16)
-            painter.end()
-            pixmap.save(alert_icon_path)
-        
-        # Reload the icons
-        self.icon_connected = QtGui.QIcon(connected_icon_path)
-        self.icon_disconnected = QtGui.QIcon(disconnected_icon_path)
-        self.icon_alert = QtGui.QIcon(alert_icon_path)
+        """Load the tray icons, painting in-memory defaults for any missing files."""
+        self.icon_connected = self._load_icon(CONNECTED_ICON, QtGui.QColor(0, 128, 0))  # Green
+        self.icon_disconnected = self._load_icon(DISCONNECTED_ICON, QtGui.QColor(128, 128, 128))  # Gray
+        self.icon_alert = self._load_icon(ALERT_ICON, QtGui.QColor(255, 0, 0))  # Red
+    
+    def _load_icon(self, path, color):
+        """Load an icon from disk, or paint a default one if the file is missing."""
+        if ICONS_READY or os.path.exists(path):
+            return QtGui.QIcon(path)
+        pixmap = self._make_dot(color)
+        # The desktop entry points at these files, so write the default out once the event loop is idle
+        QtCore.QTimer.singleShot(0, lambda: self._save_icon(pixmap, path))
+        return QtGui.QIcon(pixmap)
+    
+    def _make_dot(self, color):
+        """Paint a 32x32 coloured dot."""
+        pixmap = QtGui.QPixmap(32, 32)
+        pixmap.fill(QtCore.Qt.transparent)
+        painter = QtGui.QPainter(pixmap)
+        painter.setPen(QtCore.Qt.NoPen)
+        painter.setBrush(QtGui.QBrush(color))
+        painter.drawEllipse(8, 8, 16, 16)
+        painter.end()
+        return pixmap
+    
+    def _save_icon(self, pixmap, path):
+        """Write a painted default icon to disk."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if not pixmap.save(path):
+            logger.warning(f"Failed to save icon to {path}")
+    
+    def _set_icon(self, key, icon):
+        """Set the tray icon, skipping the repaint if it is already showing."""
+        if self.current_icon != key:
+            self.current_icon = key
+            self.setIcon(icon)
+    
+    def _set_status(self, text):
+        """Set the status menu text if it has changed."""
+        if self.status_action.text() != text:
+            self.status_action.setText(text)
     
     def mqtt_connected(self):
         """Called when MQTT client connects successfully."""
-        self.setIcon(self.icon_connected)
-        self.status_action.setText("Status: Connected")
+        self._set_icon('connected', self.icon_connected)
+        self._set_status("Status: Connected")
         self.showMessage('MQTT Alert Notifier', 'Connected to MQTT broker', self.icon_connected, 3000)
+        # The network may not have been up at startup; retry the fallback sound now that it is
+        if not os.path.exists(ALERT_SOUND) and not os.path.exists(FALLBACK_SOUND):
+            self.start_fallback_download()
     
     def mqtt_disconnected(self):
         """Called when MQTT client disconnects."""
-        self.setIcon(self.icon_disconnected)
-        self.status_action.setText("Status: Disconnected")
+        self._set_icon('disconnected', self.icon_disconnected)
+        self._set_status("Status: Disconnected")
     
     def mqtt_connection_failed(self):
         """Called when MQTT client fails to connect."""
-        self.setIcon(self.icon_disconnected)
-        self.status_action.setText("Status: Connection Failed")
+        self._set_icon('disconnected', self.icon_disconnected)
+        self._set_status("Status: Connection Failed")
         self.showMessage('MQTT Alert Notifier', 'Failed to connect to MQTT broker', self.icon_disconnected, 3000)
     
-    def check_connection(self):
-        """Periodically check if the MQTT client is still connected."""
-        if self.mqtt_client and not self.mqtt_client.connected:
-            logger.info("Connection check: Not connected. Attempting to reconnect...")
-            self.reconnect()
-    
     def reconnect(self):
         """Reconnect to the MQTT broker."""
         if self.mqtt_client:
-            self.mqtt_client.stop()
-        
-        self.mqtt_client = MQTTClient(self)
-        self.mqtt_client.start()
+            self.mqtt_client.reconnect()
+    
+    def queue_alert(self):
+        """Schedule an alert notification, merging alerts that arrive in quick succession."""
+        self.alert_pending = True
+        if not self.alert_flush_timer.isActive():
+            self.alert_flush_timer.start(200)
+    
+    def flush_alert(self):
+        """Show one notification for all alerts queued since the last flush."""
+        if self.alert_pending:
+            self.alert_pending = False
+            self.show_alert_notification()
     
     def show_alert_notification(self):
         """Show alert notification and change icon."""
-        self.setIcon(self.icon_alert)
+        self._set_icon('alert', self.icon_alert)
         self.showMessage(
             'Alert Notification', 
             'Emergency alert received! Please check official sources.',
@@ -331,9 +484,9 @@ class SystemTrayApp(QtWidgets.QSystemTrayIcon):
     def reset_icon_after_alert(self):
         """Reset icon to connected state after alert."""
         if self.mqtt_client and self.mqtt_client.connected:
-            self.setIcon(self.icon_connected)
+            self._set_icon('connected', self.icon_connected)
         else:
-            self.setIcon(self.icon_disconnected)
+            self._set_icon('disconnected', self.icon_disconnected)
     
     def test_notification(self):
         """Test the notification system."""
@@ -341,6 +494,7 @@ class SystemTrayApp(QtWidgets.QSystemTrayIcon):
     
     def show_about(self):
         """Show about dialog."""
+        settings.load()
         QtWidgets.QMessageBox.about(
             None,
             "About MQTT Alert Notifier",
@@ -352,6 +506,7 @@ class SystemTrayApp(QtWidgets.QSystemTrayIcon):
     
     def show_settings(self):
         """Show settings dialog."""
+        settings.load()
         # Create dialog
         dialog = QtWidgets.QDialog(None)
         dialog.setWindowTitle("MQTT Alert Notifier Settings")
@@ -433,11 +588,12 @@ class SystemTrayApp(QtWidgets.QSystemTrayIcon):
                 QtWidgets.QMessageBox.information(
                     None, 
                     "Settings Saved", 
-                    "Settings have been saved. Reconnecting to apply changes..."
+                    "Settings have been saved. Applying changes..."
                 )
                 
-                # Reconnect with new settings
-                self.reconnect()
+                # Apply the new settings, reconnecting only if the connection details changed
+                if self.mqtt_client:
+                    self.mqtt_client.apply_settings()
             else:
                 QtWidgets.QMessageBox.warning(
                     None, 
@@ -455,34 +611,123 @@ class SystemTrayApp(QtWidgets.QSystemTrayIcon):
         """Play the alert sound."""
         try:
             # Check if the custom alert sound file exists
-            if os.path.exists(self.alert_sound_path):
-                sound_file = self.alert_sound_path
+            if os.path.exists(ALERT_SOUND):
+                sound_file = ALERT_SOUND
                 logger.info(f"Using custom alert sound: {sound_file}")
             else:
-                # If custom sound doesn't exist, use fallback
-                logger.warning(f"Custom alert sound not found at {self.alert_sound_path}")
-                
-                # Check if fallback sound exists, if not download a default one
-                if not os.path.exists(self.fallback_sound_path):
-                    logger.info("Fallback sound not found. Downloading a default one...")
-                    try:
-                        # URL for a sample alert sound
-                        sound_url = "https://www.soundjay.com/mechanical/sounds/alarm-1.mp3"
-                        urllib.request.urlretrieve(sound_url, self.fallback_sound_path)
-                        logger.info(f"Downloaded alert sound to {self.fallback_sound_path}")
-                    except Exception as download_error:
-                        logger.error(f"Failed to download alert sound: {download_error}")
+                # If custom sound doesn't exist, use fallback (downloaded at startup)
+                logger.warning(f"Custom alert sound not found at {ALERT_SOUND}")
+                if not os.path.exists(FALLBACK_SOUND):
+                    # Retry in the background for the next alert; this one beeps
+                    self.start_fallback_download()
+                    raise FileNotFoundError(f"Fallback sound not available at {FALLBACK_SOUND}")
                 
-                sound_file = self.fallback_sound_path
+                sound_file = FALLBACK_SOUND
+            
+            self.setup_alert_sound()
+            if self.alert_player is None:
+                self.play_sound_with_paplay(sound_file)
+                return
+            if self.alert_player.availability() != QtMultimedia.QMultimedia.Available:
+                # No usable multimedia backend (e.g. missing GStreamer plugins)
+                logger.warning("Qt multimedia backend unavailable, falling back to paplay")
+                self.play_sound_with_paplay(sound_file)
+                return
+            
+            if self.loaded_sound_path != sound_file:
+                self.load_alert_sound(sound_file)
             
-            # Use system audio player to play the sound
+            # Restart from the first repeat in case a previous alert is still playing
+            self.alert_player.stop()
+            self.alert_playlist.setCurrentIndex(0)
+            self.alert_sound_requested = True
+            self.alert_player.play()
+        except Exception as e:
+            logger.error(f"Failed to play alert sound: {e}")
+            # Fallback to system beep
+            QtWidgets.QApplication.beep()
+    
+    def setup_alert_sound(self):
+        """Create the media player and preload the alert sound so an alert doesn't spawn players or re-open the file."""
+        global QtMultimedia
+        if self.alert_player is not None or self.qt_sound_unavailable:
+            return
+        if not os.path.exists(ALERT_SOUND) and not os.path.exists(FALLBACK_SOUND):
+            # Fetch the fallback now so the first alert never waits on the network
+            self.start_fallback_download()
+        try:
+            from PyQt5 import QtMultimedia
+        except ImportError as e:
+            # e.g. a missing libpulse-mainloop-glib; an exception escaping this Qt slot would abort the app
+            logger.warning(f"Qt multimedia unavailable ({e}), alert sounds will use paplay")
+            self.qt_sound_unavailable = True
+            return
+        self.alert_player = QtMultimedia.QMediaPlayer(self)
+        self.alert_playlist = QtMultimedia.QMediaPlaylist(self)
+        self.alert_player.setPlaylist(self.alert_playlist)
+        self.alert_player.mediaStatusChanged.connect(self.alert_sound_status_changed)
+        self.alert_player.error.connect(self.alert_sound_error)
+        if os.path.exists(ALERT_SOUND):
+            self.load_alert_sound(ALERT_SOUND)
+    
+    def start_fallback_download(self):
+        """Download the fallback alert sound in the background, unless a download is already running."""
+        if self.fallback_download is not None and self.fallback_download.is_alive():
+            return
+        self.fallback_download = threading.Thread(target=self.download_fallback_sound, daemon=True)
+        self.fallback_download.start()
+    
+    def download_fallback_sound(self):
+        """Download the fallback alert sound; runs in a background thread."""
+        logger.info("Fallback sound not found. Downloading a default one...")
+        tmp_path = FALLBACK_SOUND + '.tmp'
+        try:
+            import urllib.request
+            urllib.request.urlretrieve(FALLBACK_SOUND_URL, tmp_path)
+            # Rename into place so a partial download is never played
+            os.replace(tmp_path, FALLBACK_SOUND)
+            logger.info(f"Downloaded alert sound to {FALLBACK_SOUND}")
+        except Exception as e:
+            logger.error(f"Failed to download alert sound: {e}")
+    
+    def load_alert_sound(self, path):
+        """Queue the alert sound in the media player, repeated for emphasis."""
+        media = QtMultimedia.QMediaContent(QtCore.QUrl.fromLocalFile(path))
+        self.alert_playlist.clear()
+        for _ in range(ALERT_SOUND_REPEATS):
+            self.alert_playlist.addMedia(media)
+        self.loaded_sound_path = path
+    
+    def alert_sound_status_changed(self, status):
+        """Fall back to paplay if Qt can't decode the alert sound."""
+        if status == QtMultimedia.QMediaPlayer.InvalidMedia:
+            self.fall_back_to_paplay(f"Qt cannot play {self.loaded_sound_path}")
+        elif status in (QtMultimedia.QMediaPlayer.BufferedMedia, QtMultimedia.QMediaPlayer.EndOfMedia):
+            self.alert_sound_requested = False
+    
+    def alert_sound_error(self, error):
+        """Fall back to paplay if the media player reports an error, e.g. a missing backend."""
+        self.fall_back_to_paplay(f"Qt media player error {error}")
+    
+    def fall_back_to_paplay(self, reason):
+        """Play the loaded sound with paplay instead of the media player."""
+        # Only react while an alert is actually waiting on the sound, and only once per alert
+        if not self.alert_sound_requested:
+            return
+        self.alert_sound_requested = False
+        self.alert_player.stop()
+        logger.warning(f"{reason}, falling back to paplay")
+        self.play_sound_with_paplay(self.loaded_sound_path)
+    
+    def play_sound_with_paplay(self, sound_file):
+        """Play the alert sound using the system audio player."""
+        try:
+            import subprocess
             subprocess.Popen(['paplay', sound_file])
             
-            # Play the sound multiple times for emphasis
-            for _ in range(2):
-                # Wait a bit between plays
-                QtCore.QTimer.singleShot(1500, lambda: subprocess.Popen(['paplay', sound_file]))
-                
+            # Play the sound multiple times for emphasis, 1.5 seconds apart
+            for i in range(1, ALERT_SOUND_REPEATS):
+                QtCore.QTimer.singleShot(1500 * i, functools.partial(subprocess.Popen, ['paplay', sound_file]))
         except Exception as e:
             logger.error(f"Failed to play alert sound: {e}")
             # Fallback to system beep